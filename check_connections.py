@@ -1,9 +1,10 @@
 import mysql.connector
 import chromadb
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 def check_sql():
-    print("1. Testing SQL Connection (MariaDB)...", end=" ")
+    label = "1. Testing SQL Connection (MariaDB)..."
     try:
         conn = mysql.connector.connect(
             host="localhost", 
@@ -13,31 +14,35 @@ def check_sql():
             port=3306
         )
         if conn.is_connected():
-            print("✅ SUCCESS!")
+            print(f"{label} ✅ SUCCESS!")
             conn.close()
             return True
     except Exception as e:
-        print(f"❌ FAILED: {e}")
+        print(f"{label} ❌ FAILED: {e}")
         return False
 
 def check_vector():
-    print("2. Testing Vector Connection (ChromaDB)...", end=" ")
+    label = "2. Testing Vector Connection (ChromaDB)..."
     try:
         # The new client connection method
         chroma_client = chromadb.HttpClient(host='localhost', port=8000)
         
         # New "Health Check": Try to get the version or list collections
         version = chroma_client.get_version()
-        print(f"✅ SUCCESS! (v{version})")
+        print(f"{label} ✅ SUCCESS! (v{version})")
         return True
     except Exception as e:
-        print(f"❌ FAILED: {e}")
+        print(f"{label} ❌ FAILED: {e}")
         return False
 
 if __name__ == "__main__":
     print("--- INFRASTRUCTURE DIAGNOSTIC ---")
-    sql = check_sql()
-    vec = check_vector()
+    # Both checks just wait on the network, so probe them concurrently.
+    # Each check prints its full result line once done (order may vary).
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        sql_f = ex.submit(check_sql)
+        vec_f = ex.submit(check_vector)
+        sql, vec = sql_f.result(), vec_f.result()
     
     if sql and vec:
         print("\n🎉 GREAT SUCCESS! Your Data Center is live.")
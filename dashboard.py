@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
-from sqlmodel import Session, select, func
+from sqlmodel import select, func
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -15,61 +15,153 @@ from database.models import Machine, SensorLog
 from llm.anomaly_detector import AnomalyDetector
 
 try:
-    from llm.agent import agent_executor
+    from llm.agent import get_agent_executor
     AGENT_AVAILABLE = True
 except Exception as e:
     st.error(f"⚠️ Agent could not be loaded: {e}")
     AGENT_AVAILABLE = False
 
+@st.cache_resource
+def get_agent():
+    """Build the agent on first use and share one instance across sessions."""
+    return get_agent_executor()
+
 # 1. Page Config
 st.set_page_config(page_title="Industrial AI Agent", page_icon="🏭", layout="wide")
 load_dotenv()
 
+# Trend charts on the analytics tab: (subheader, column, y-axis label)
+TREND_CHARTS = [
+    ("🌡️ Temperature Trends", "process_temp_k", "Temperature (K)"),
+    ("⚙️ RPM Trends", "rpm", "RPM"),
+    ("🔧 Torque Trends", "torque_nm", "Torque (Nm)"),
+]
+
+# Line colour per machine (cycled); the min/max band uses the same colour, translucent
+MACHINE_COLORS = px.colors.qualitative.Plotly
+
+def band_color(hex_color: str, alpha: float = 0.2) -> str:
+    r, g, b = px.colors.hex_to_rgb(hex_color)
+    return f"rgba({r}, {g}, {b}, {alpha})"
+
+def build_trend_fig(groups: dict, y_col: str, y_label: str) -> go.Figure:
+    """
+    One line per machine for `y_col` (bucket average), drawn with WebGL (Scattergl),
+    over a shaded min/max band so spikes inside a bucket stay visible.
+    """
+    fig = go.Figure()
+    for i, (machine_id, machine_data) in enumerate(groups.items()):
+        color = MACHINE_COLORS[i % len(MACHINE_COLORS)]
+        group = f'M{machine_id}'
+        x = machine_data['timestamp']
+        # Band: max edge first, then min edge filled up to it
+        fig.add_trace(go.Scattergl(x=x, y=machine_data[f'{y_col}_max'], mode='lines', line=dict(width=0),
+                                   legendgroup=group, showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scattergl(x=x, y=machine_data[f'{y_col}_min'], mode='lines', line=dict(width=0),
+                                   fill='tonexty', fillcolor=band_color(color),
+                                   legendgroup=group, showlegend=False, hoverinfo='skip'))
+        fig.add_trace(
+            go.Scattergl(x=x, y=machine_data[y_col], mode='lines', name=f'Machine {machine_id}',
+                         line=dict(width=2, color=color), legendgroup=group)
+        )
+    fig.update_layout(
+        xaxis_title="Time",
+        yaxis_title=y_label,
+        hovermode='x unified',
+        height=300
+    )
+    return fig
+
 # --- FUNCTION: FETCH DATA ---
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink sensor frames to 32-bit dtypes (halves memory, cache pickles and chart JSON)."""
+    float_cols = df.select_dtypes("float64").columns
+    int_cols = df.select_dtypes("int64").columns
+    df[float_cols] = df[float_cols].astype("float32")
+    df[int_cols] = df[int_cols].astype("int32")
+    return df
+
+# Cached with a short TTL so widget interactions and chat reruns reuse the
+# last result instead of querying MariaDB on every rerun.
+@st.cache_data(ttl=5)
 def get_live_status():
     try:
-        with Session(engine) as session:
-            subquery = (
-                select(SensorLog.machine_id, func.max(SensorLog.timestamp).label("max_time"))
-                .group_by(SensorLog.machine_id).subquery()
-            )
-            statement = (
-                select(Machine.id, Machine.model_name, SensorLog.failure_type, 
-                      SensorLog.air_temp_k, SensorLog.process_temp_k, SensorLog.rpm, 
-                      SensorLog.torque_nm, SensorLog.tool_wear_min, SensorLog.timestamp)
-                .join(SensorLog, Machine.id == SensorLog.machine_id)
-                .join(subquery, (SensorLog.machine_id == subquery.c.machine_id) & (SensorLog.timestamp == subquery.c.max_time))
-                .order_by(Machine.id)
-            )
-            results = session.exec(statement).all()
-            if results:
-                return pd.DataFrame(results, columns=['machine_id', 'model_name', 'failure_type', 
-                                                      'air_temp_k', 'process_temp_k', 'rpm', 
-                                                      'torque_nm', 'tool_wear_min', 'timestamp'])
-            return pd.DataFrame()
+        # Latest reading per machine: GROUP BY machine_id + MAX(timestamp) is a
+        # loose index scan on idx_machine_time; MAX(id) breaks timestamp ties.
+        latest_time = (
+            select(SensorLog.machine_id, func.max(SensorLog.timestamp).label("max_time"))
+            .group_by(SensorLog.machine_id).subquery()
+        )
+        latest = (
+            select(func.max(SensorLog.id).label("log_id"))
+            .join(latest_time, (SensorLog.machine_id == latest_time.c.machine_id)
+                  & (SensorLog.timestamp == latest_time.c.max_time))
+            .group_by(SensorLog.machine_id).subquery()
+        )
+        statement = (
+            select(Machine.id.label("machine_id"), Machine.model_name, SensorLog.failure_type,
+                   SensorLog.air_temp_k, SensorLog.process_temp_k, SensorLog.rpm,
+                   SensorLog.torque_nm, SensorLog.tool_wear_min, SensorLog.timestamp)
+            .join(SensorLog, Machine.id == SensorLog.machine_id)
+            .join(latest, SensorLog.id == latest.c.log_id)
+            .order_by(Machine.id)
+        )
+        # Read straight into a DataFrame (no ORM row objects)
+        with engine.connect() as conn:
+            return downcast(pd.read_sql(statement, conn))
     except Exception as e:
         st.sidebar.error(f"DB Error: {e}")
         return pd.DataFrame()
 
-def get_sensor_history(machine_ids: list, limit: int = 500):
-    """Get sensor history for multiple machines."""
+@st.cache_data(ttl=10)
+def get_sensor_history(machine_ids: tuple, limit: int = 500, target_points: int = 500):
+    """
+    Get downsampled sensor history for multiple machines.
+
+    The time window spans the latest `limit` readings. Rows are bucketed in SQL
+    so each machine returns ~`target_points` rows (min/max/avg per bucket)
+    no matter how long the window is.
+    """
     try:
         # Convert numpy types to Python ints (fixes SQLModel compatibility)
         machine_ids = [int(mid) for mid in machine_ids]
-        
-        with Session(engine) as session:
-            statement = (
-                select(SensorLog.machine_id, SensorLog.timestamp, 
-                      SensorLog.process_temp_k, SensorLog.rpm, SensorLog.torque_nm)
-                .where(SensorLog.machine_id.in_(machine_ids))
-                .order_by(SensorLog.timestamp.desc())
-                .limit(limit)
-            )
-            results = session.exec(statement).all()
-            if results:
-                return pd.DataFrame(results, columns=['machine_id', 'timestamp', 
-                                                      'process_temp_k', 'rpm', 'torque_nm'])
-            return pd.DataFrame()
+
+        # 1. Time window covered by the latest `limit` readings
+        latest = (
+            select(SensorLog.timestamp)
+            .where(SensorLog.machine_id.in_(machine_ids))
+            .order_by(SensorLog.timestamp.desc())
+            .limit(limit)
+            .subquery()
+        )
+        window = select(func.min(latest.c.timestamp).label("t_min"),
+                        func.max(latest.c.timestamp).label("t_max")).subquery()
+
+        # 2. Bucket the window so each machine yields ~target_points rows.
+        # The window is joined in, so bounds + buckets are a single round-trip.
+        bucket_seconds = func.greatest(
+            (func.unix_timestamp(window.c.t_max) - func.unix_timestamp(window.c.t_min)) / target_points, 1
+        )
+        bucket = func.floor(func.unix_timestamp(SensorLog.timestamp) / bucket_seconds)
+        statement = (
+            select(SensorLog.machine_id,
+                   func.min(SensorLog.timestamp).label("timestamp"),
+                   func.avg(SensorLog.process_temp_k).label("process_temp_k"),
+                   func.min(SensorLog.process_temp_k).label("process_temp_k_min"),
+                   func.max(SensorLog.process_temp_k).label("process_temp_k_max"),
+                   func.avg(SensorLog.rpm).label("rpm"),
+                   func.min(SensorLog.rpm).label("rpm_min"),
+                   func.max(SensorLog.rpm).label("rpm_max"),
+                   func.avg(SensorLog.torque_nm).label("torque_nm"),
+                   func.min(SensorLog.torque_nm).label("torque_nm_min"),
+                   func.max(SensorLog.torque_nm).label("torque_nm_max"))
+            .join_from(SensorLog, window, SensorLog.timestamp >= window.c.t_min)
+            .where(SensorLog.machine_id.in_(machine_ids))
+            .group_by(SensorLog.machine_id, bucket)
+        )
+        with engine.connect() as conn:
+            # coerce_float: AVG() over INT columns comes back as DECIMAL
+            return downcast(pd.read_sql(statement, conn, coerce_float=True))
     except Exception as e:
         st.error(f"Error loading history: {e}")
         return pd.DataFrame()
@@ -79,19 +171,19 @@ status_df = get_live_status()
 # --- SIDEBAR: LIVE STATUS ---
 st.sidebar.title("🏭 Plant Status")
 if not status_df.empty:
-    for _, row in status_df.iterrows():
-        color = "green" if row['failure_type'] == "Normal" else "red"
-        icon = "✅" if row['failure_type'] == "Normal" else "🔥"
-        with st.sidebar.expander(f"{icon} Machine {row['machine_id']}", expanded=(color=="red")):
-            st.markdown(f"**Model:** {row['model_name']}")
-            st.markdown(f"**Status:** :{color}[{row['failure_type']}]")
-            st.markdown(f"**Temp:** {row['air_temp_k']:.1f} K")
+    # One virtualized table for the whole fleet; failing machines highlighted
+    fleet_view = status_df[['machine_id', 'model_name', 'failure_type', 'air_temp_k']].style.map(
+        lambda v: 'background-color: red' if v != 'Normal' else '', subset=['failure_type']
+    ).format({'air_temp_k': '{:.1f}'})
+    st.sidebar.dataframe(fleet_view, width="stretch", hide_index=True)
 
 # --- MAIN PAGE TABS ---
 tab1, tab2 = st.tabs(["💬 AI Assistant", "📈 Live Analytics"])
 
 # === TAB 1: THE AGENT ===
-with tab1:
+# Each tab is a fragment so its widgets only rerun that tab, not the whole page.
+@st.fragment
+def chat_tab():
     st.title("🤖 Maintenance Assistant")
     
     if "messages" not in st.session_state:
@@ -118,7 +210,7 @@ with tab1:
                 message_placeholder = st.empty()
                 with st.spinner("🧠 Agent is thinking..."):
                     try:
-                        response = agent_executor.invoke({
+                        response = get_agent().invoke({
                             "input": prompt,
                             "chat_history": chat_history
                         })
@@ -129,7 +221,8 @@ with tab1:
                         message_placeholder.error(f"Agent Logic Error: {e}")
 
 # === TAB 2: ANALYTICS ===
-with tab2:
+@st.fragment
+def analytics_tab(status_df: pd.DataFrame):
     st.title("📈 Live Sensor Analytics")
     
     if not status_df.empty:
@@ -151,74 +244,20 @@ with tab2:
         
         if selected_machines:
             try:
-                # Convert to list of ints (handles both numpy and Python types)
-                selected_machines_int = [int(mid) for mid in selected_machines]
+                # Convert to a sorted tuple of ints (hashable cache key, handles numpy types)
+                selected_machines_int = tuple(sorted(int(mid) for mid in selected_machines))
                 # Get sensor history for selected machines
                 hist_df = get_sensor_history(selected_machines_int, limit=limit)
                 
                 if not hist_df.empty:
+                    # Sort once, then partition by machine in a single pass
                     hist_df = hist_df.sort_values("timestamp")
+                    groups = dict(list(hist_df.groupby('machine_id')))
                     
                     # Create multi-machine plots using Plotly
-                    st.subheader("🌡️ Temperature Trends")
-                    fig_temp = go.Figure()
-                    for machine_id in selected_machines:
-                        machine_data = hist_df[hist_df['machine_id'] == machine_id]
-                        if not machine_data.empty:
-                            fig_temp.add_trace(go.Scatter(
-                                x=machine_data['timestamp'],
-                                y=machine_data['process_temp_k'],
-                                mode='lines',
-                                name=f'Machine {machine_id}',
-                                line=dict(width=2)
-                            ))
-                    fig_temp.update_layout(
-                        xaxis_title="Time",
-                        yaxis_title="Temperature (K)",
-                        hovermode='x unified',
-                        height=300
-                    )
-                    st.plotly_chart(fig_temp, width="stretch")
-                    
-                    st.subheader("⚙️ RPM Trends")
-                    fig_rpm = go.Figure()
-                    for machine_id in selected_machines:
-                        machine_data = hist_df[hist_df['machine_id'] == machine_id]
-                        if not machine_data.empty:
-                            fig_rpm.add_trace(go.Scatter(
-                                x=machine_data['timestamp'],
-                                y=machine_data['rpm'],
-                                mode='lines',
-                                name=f'Machine {machine_id}',
-                                line=dict(width=2)
-                            ))
-                    fig_rpm.update_layout(
-                        xaxis_title="Time",
-                        yaxis_title="RPM",
-                        hovermode='x unified',
-                        height=300
-                    )
-                    st.plotly_chart(fig_rpm, width="stretch")
-                    
-                    st.subheader("🔧 Torque Trends")
-                    fig_torque = go.Figure()
-                    for machine_id in selected_machines:
-                        machine_data = hist_df[hist_df['machine_id'] == machine_id]
-                        if not machine_data.empty:
-                            fig_torque.add_trace(go.Scatter(
-                                x=machine_data['timestamp'],
-                                y=machine_data['torque_nm'],
-                                mode='lines',
-                                name=f'Machine {machine_id}',
-                                line=dict(width=2)
-                            ))
-                    fig_torque.update_layout(
-                        xaxis_title="Time",
-                        yaxis_title="Torque (Nm)",
-                        hovermode='x unified',
-                        height=300
-                    )
-                    st.plotly_chart(fig_torque, width="stretch")
+                    for title, y_col, y_label in TREND_CHARTS:
+                        st.subheader(title)
+                        st.plotly_chart(build_trend_fig(groups, y_col, y_label), width="stretch")
                     
                     # Combined view option
                     st.subheader("📊 Combined View")
@@ -230,24 +269,22 @@ with tab2:
                             vertical_spacing=0.1
                         )
                         
-                        for machine_id in selected_machines:
-                            machine_data = hist_df[hist_df['machine_id'] == machine_id]
-                            if not machine_data.empty:
-                                fig_combined.add_trace(
-                                    go.Scatter(x=machine_data['timestamp'], y=machine_data['process_temp_k'],
+                        for machine_id, machine_data in groups.items():
+                            fig_combined.add_trace(
+                                go.Scattergl(x=machine_data['timestamp'], y=machine_data['process_temp_k'],
                                              name=f'M{machine_id} Temp', legendgroup=f'M{machine_id}'),
-                                    row=1, col=1
-                                )
-                                fig_combined.add_trace(
-                                    go.Scatter(x=machine_data['timestamp'], y=machine_data['rpm'],
+                                row=1, col=1
+                            )
+                            fig_combined.add_trace(
+                                go.Scattergl(x=machine_data['timestamp'], y=machine_data['rpm'],
                                              name=f'M{machine_id} RPM', legendgroup=f'M{machine_id}', showlegend=False),
-                                    row=2, col=1
-                                )
-                                fig_combined.add_trace(
-                                    go.Scatter(x=machine_data['timestamp'], y=machine_data['torque_nm'],
+                                row=2, col=1
+                            )
+                            fig_combined.add_trace(
+                                go.Scattergl(x=machine_data['timestamp'], y=machine_data['torque_nm'],
                                              name=f'M{machine_id} Torque', legendgroup=f'M{machine_id}', showlegend=False),
-                                    row=3, col=1
-                                )
+                                row=3, col=1
+                            )
                         
                         fig_combined.update_layout(height=800, title_text="Multi-Machine Sensor Dashboard")
                         st.plotly_chart(fig_combined, width="stretch")
@@ -258,4 +295,10 @@ with tab2:
         else:
             st.info("Please select at least one machine to view analytics.")
     else:
-        st.warning("No machine data available. Please ensure sensor data is being streamed.")
\ No newline at end of file
+        st.warning("No machine data available. Please ensure sensor data is being streamed.")
+
+with tab1:
+    chat_tab()
+
+with tab2:
+    analytics_tab(status_df)
@@ -24,7 +24,16 @@ def _build_database_url() -> str:
 
 
 DATABASE_URL = _build_database_url()
-engine = create_engine(DATABASE_URL, echo=False)
+# Pooled engine shared by the dashboard, API and scripts.
+# pool_pre_ping drops connections MariaDB closed while idle; pool_recycle keeps
+# connections younger than the server's wait_timeout.
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    pool_size=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
 
 def get_session():
     with Session(engine) as session:
@@ -1,7 +1,7 @@
 # database/models.py
 from datetime import datetime
 from typing import Optional
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Index
 
 # 1. Update the Machine Table
 class Machine(SQLModel, table=True):
@@ -17,8 +17,11 @@ class Machine(SQLModel, table=True):
 # 2. Update the Sensor Logs Table
 class SensorLog(SQLModel, table=True):
     __tablename__ = "sensor_logs"
-    # Add this line 👇
-    __table_args__ = {"extend_existing": True}
+    # Composite index for "latest reading per machine" lookups (matches scripts/init.sql)
+    __table_args__ = (
+        Index("idx_machine_time", "machine_id", "timestamp"),
+        {"extend_existing": True},
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     machine_id: int = Field(foreign_key="machines.id")
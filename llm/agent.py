@@ -10,6 +10,8 @@ import os
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
 
 # Classic agents live in `langchain_classic`, not `langchain.agents`.
 from langchain_classic.agents import AgentExecutor
@@ -19,6 +21,15 @@ from .tools import check_machine_status, lookup_manual, scan_for_failures
 
 load_dotenv()
 
+# Exact-match LLM response cache (process-wide).
+# The agent runs at temperature=0, so an identical prompt (system prompt + history
+# + input + tool outputs so far) always yields the same completion. Tool outputs are
+# part of the key, so fresh sensor readings still produce a fresh LLM call.
+# Bounded (oldest entries evicted first): most prompts embed one-off tool output,
+# and this lives in the long-running Streamlit process.
+LLM_CACHE_SIZE = 256
+set_llm_cache(InMemoryCache(maxsize=LLM_CACHE_SIZE))
+
 
 SYSTEM_PROMPT = """You are a Senior Field Engineer for industrial 3D printers.
 You NEVER say "read the manual" – you ARE the manual.
@@ -89,7 +100,3 @@ def get_agent_executor() -> AgentExecutor:
         verbose=True,
         handle_parsing_errors=True,
     )
-
-
-# Global instance imported by the Streamlit dashboard
-agent_executor = get_agent_executor()
\ No newline at end of file
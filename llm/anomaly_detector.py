@@ -2,9 +2,17 @@
 Autonomous Anomaly Detection Module
 Detects anomalies based on physics constraints without user input.
 """
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; a NumPy kernel is used instead
+    NUMBA_AVAILABLE = False
+
 class AnomalyDetector:
     """
     Autonomous anomaly detection based on sensor thresholds.
@@ -30,7 +38,72 @@ class AnomalyDetector:
     NORMAL_TORQUE_MIN = 40.0  # Nm
     NORMAL_TORQUE_MAX = 60.0  # Nm
     TOOL_WEAR_LIMIT = 200  # minutes
+
+    # Worst anomaly severity -> overall machine status (index = rank)
+    SEVERITY_RANK = {'MEDIUM': 1, 'HIGH': 2, 'CRITICAL': 3}
+    OVERALL_STATUS = ('NORMAL', 'CAUTION', 'WARNING', 'CRITICAL')
     
+    # Anomaly catalogue: code -> (type, description template, recommended action).
+    # Shared by the scalar and vectorized detectors so both report identical text.
+    ANOMALY_INFO = {
+        'TR-001': (
+            'Thermal Runaway',
+            'Hotend temperature is {temp_c:.1f}°C ({temp_k:.1f}K) during operation (RPM: {rpm}), '
+            'which is below the {limit_c:.0f}°C minimum expected while printing/heat-up. '
+            'This indicates thermal runaway / heater not reaching setpoint.',
+            'Stop the machine. Inspect heater cartridge, thermistor seating/connection, and wiring harness. '
+            'Verify PSU output and mainboard heater MOSFET if applicable.',
+        ),
+        'FF-001': (
+            'Fan Failure',
+            'Fan RPM is 0 while temperature is {temp_k:.1f}K. The cooling fan is not operating, which can lead to overheating.',
+            'Check fan power connection, debris blockage, and fan motor. Replace if necessary.',
+        ),
+        'MS-001': (
+            'Motor Strain',
+            'Torque reading {torque:.1f} Nm exceeds normal operating range (40-60 Nm). This indicates excessive mechanical resistance or jam.',
+            'Check for mechanical obstructions, belt tension, and motor condition. Reduce load if possible.',
+        ),
+        'TA-001': (
+            'Temperature Anomaly',
+            'Temperature {temp_k:.1f}K is {issue} normal operating range (300-315K).',
+            'Verify thermistor calibration and heating system operation.',
+        ),
+        'TW-001': (
+            'Tool Wear',
+            'Tool wear {tool_wear} minutes exceeds recommended limit of {limit} minutes.',
+            'Schedule tool replacement to prevent failure.',
+        ),
+        'RPM-001': (
+            'RPM Anomaly',
+            'RPM {rpm} is outside normal operating range (1200-1800 RPM).',
+            'Check fan motor, power supply, and control system.',
+        ),
+    }
+
+    # Bit i of a `detect_anomalies_kernel` flag word -> (code, severity).
+    # Same order as the scalar rules; MS-001 severity depends on the torque reading.
+    ANOMALY_BITS = (
+        ('TR-001', 'CRITICAL'),
+        ('FF-001', 'HIGH'),
+        ('MS-001', None),
+        ('TA-001', 'MEDIUM'),
+        ('TW-001', 'MEDIUM'),
+        ('RPM-001', 'MEDIUM'),
+    )
+
+    @staticmethod
+    def _anomaly(code: str, severity: str, **fields) -> Dict:
+        """Build an anomaly dict for `code`, filling its description template with `fields`."""
+        anomaly_type, description, action = AnomalyDetector.ANOMALY_INFO[code]
+        return {
+            'type': anomaly_type,
+            'code': code,
+            'severity': severity,
+            'description': description.format(**fields),
+            'recommended_action': action,
+        }
+
     @staticmethod
     def detect_anomalies(sensor_data: Dict) -> List[Dict]:
         """
@@ -43,15 +116,27 @@ class AnomalyDetector:
             List of anomaly dictionaries with type, severity, and description
         """
         anomalies = []
-        
-        temp_k = sensor_data.get('temperature', 0)
+        anomaly = AnomalyDetector._anomaly
+
+        # Bind thresholds to locals once (fast local lookups in fleet-scan loops)
+        printing_temp_min = AnomalyDetector.PRINTING_TEMP_MIN_K
+        runaway_limit_k = AnomalyDetector.THERMAL_RUNAWAY_LIMIT_K
+        temp_min = AnomalyDetector.NORMAL_TEMP_MIN
+        temp_max = AnomalyDetector.NORMAL_TEMP_MAX
+        rpm_min = AnomalyDetector.NORMAL_RPM_MIN
+        rpm_max = AnomalyDetector.NORMAL_RPM_MAX
+        torque_max = AnomalyDetector.NORMAL_TORQUE_MAX
+        tool_wear_limit = AnomalyDetector.TOOL_WEAR_LIMIT
+
+        # Coerce once up front instead of isinstance() checks per rule (None -> 0.0)
+        temp_k = float(sensor_data.get('temperature') or 0.0)
         rpm = sensor_data.get('rpm', 0)
         torque = sensor_data.get('torque', 0)
         tool_wear = sensor_data.get('tool_wear', 0)
         failure_type = sensor_data.get('status', 'Normal')
         
         # Convert temperature from Kelvin to Celsius for human-readable reporting
-        temp_c = temp_k - 273.15 if isinstance(temp_k, (int, float)) else 0.0
+        temp_c = temp_k - 273.15
 
         # 1. Thermal Runaway Detection (3D-printer hotend logic)
         # Detected if temperature is below 190°C *while* in a printing/heat-up regime.
@@ -59,89 +144,38 @@ class AnomalyDetector:
         #
         # This avoids flagging every machine when temp_k is ~300K (27–42°C),
         # which is not a printing hotend temperature.
-        if (
-            rpm > 0
-            and isinstance(temp_k, (int, float))
-            and temp_k >= AnomalyDetector.PRINTING_TEMP_MIN_K
-            and temp_k < AnomalyDetector.THERMAL_RUNAWAY_LIMIT_K
-        ):
-            anomalies.append({
-                'type': 'Thermal Runaway',
-                'code': 'TR-001',
-                'severity': 'CRITICAL',
-                'description': (
-                    f'Hotend temperature is {temp_c:.1f}°C ({temp_k:.1f}K) during operation (RPM: {rpm}), '
-                    f'which is below the {AnomalyDetector.THERMAL_RUNAWAY_LIMIT_C:.0f}°C minimum expected while printing/heat-up. '
-                    'This indicates thermal runaway / heater not reaching setpoint.'
-                ),
-                'recommended_action': (
-                    'Stop the machine. Inspect heater cartridge, thermistor seating/connection, and wiring harness. '
-                    'Verify PSU output and mainboard heater MOSFET if applicable.'
-                ),
-            })
+        if rpm > 0 and printing_temp_min <= temp_k < runaway_limit_k:
+            anomalies.append(anomaly(
+                'TR-001', 'CRITICAL', temp_c=temp_c, temp_k=temp_k, rpm=rpm,
+                limit_c=AnomalyDetector.THERMAL_RUNAWAY_LIMIT_C,
+            ))
         
         # 2. Fan Failure Detection
         # Detected if RPM = 0 during operation (when temp indicates active printing)
-        if temp_k > AnomalyDetector.NORMAL_TEMP_MIN and rpm == 0:
-            anomalies.append({
-                'type': 'Fan Failure',
-                'code': 'FF-001',
-                'severity': 'HIGH',
-                'description': f'Fan RPM is 0 while temperature is {temp_k:.1f}K. The cooling fan is not operating, which can lead to overheating.',
-                'recommended_action': 'Check fan power connection, debris blockage, and fan motor. Replace if necessary.'
-            })
+        if temp_k > temp_min and rpm == 0:
+            anomalies.append(anomaly('FF-001', 'HIGH', temp_k=temp_k))
         
         # 3. Motor Strain Detection
         # Detected if Torque > Normal Limit
-        if torque > AnomalyDetector.NORMAL_TORQUE_MAX:
-            severity = 'CRITICAL' if torque > AnomalyDetector.NORMAL_TORQUE_MAX * 1.5 else 'HIGH'
-            anomalies.append({
-                'type': 'Motor Strain',
-                'code': 'MS-001',
-                'severity': severity,
-                'description': f'Torque reading {torque:.1f} Nm exceeds normal operating range (40-60 Nm). This indicates excessive mechanical resistance or jam.',
-                'recommended_action': 'Check for mechanical obstructions, belt tension, and motor condition. Reduce load if possible.'
-            })
+        if torque > torque_max:
+            severity = 'CRITICAL' if torque > torque_max * 1.5 else 'HIGH'
+            anomalies.append(anomaly('MS-001', severity, torque=torque))
         
         # 4. Temperature Anomaly (Outside Normal Range)
-        if temp_k < AnomalyDetector.NORMAL_TEMP_MIN or temp_k > AnomalyDetector.NORMAL_TEMP_MAX:
-            if temp_k < AnomalyDetector.NORMAL_TEMP_MIN:
-                issue = 'below'
-                threshold = AnomalyDetector.NORMAL_TEMP_MIN
-            else:
-                issue = 'above'
-                threshold = AnomalyDetector.NORMAL_TEMP_MAX
-            
-            anomalies.append({
-                'type': 'Temperature Anomaly',
-                'code': 'TA-001',
-                'severity': 'MEDIUM',
-                'description': f'Temperature {temp_k:.1f}K is {issue} normal operating range (300-315K).',
-                'recommended_action': 'Verify thermistor calibration and heating system operation.'
-            })
+        if temp_k < temp_min or temp_k > temp_max:
+            issue = 'below' if temp_k < temp_min else 'above'
+            anomalies.append(anomaly('TA-001', 'MEDIUM', temp_k=temp_k, issue=issue))
         
         # 5. Tool Wear Warning
-        if tool_wear > AnomalyDetector.TOOL_WEAR_LIMIT:
-            anomalies.append({
-                'type': 'Tool Wear',
-                'code': 'TW-001',
-                'severity': 'MEDIUM',
-                'description': f'Tool wear {tool_wear} minutes exceeds recommended limit of {AnomalyDetector.TOOL_WEAR_LIMIT} minutes.',
-                'recommended_action': 'Schedule tool replacement to prevent failure.'
-            })
+        if tool_wear > tool_wear_limit:
+            anomalies.append(anomaly('TW-001', 'MEDIUM', tool_wear=tool_wear, limit=tool_wear_limit))
         
         # 6. RPM Anomaly
-        if rpm > 0 and (rpm < AnomalyDetector.NORMAL_RPM_MIN or rpm > AnomalyDetector.NORMAL_RPM_MAX):
-            anomalies.append({
-                'type': 'RPM Anomaly',
-                'code': 'RPM-001',
-                'severity': 'MEDIUM',
-                'description': f'RPM {rpm} is outside normal operating range (1200-1800 RPM).',
-                'recommended_action': 'Check fan motor, power supply, and control system.'
-            })
+        if rpm > 0 and (rpm < rpm_min or rpm > rpm_max):
+            anomalies.append(anomaly('RPM-001', 'MEDIUM', rpm=rpm))
         
         return anomalies
-    
+
     @staticmethod
     def analyze_machine(machine_data: Dict) -> Dict:
         """
@@ -151,16 +185,56 @@ class AnomalyDetector:
             Dict with status, anomalies, and summary
         """
         anomalies = AnomalyDetector.detect_anomalies(machine_data)
-        
-        # Determine overall status
-        if any(a['severity'] == 'CRITICAL' for a in anomalies):
-            overall_status = 'CRITICAL'
-        elif any(a['severity'] == 'HIGH' for a in anomalies):
-            overall_status = 'WARNING'
-        elif anomalies:
-            overall_status = 'CAUTION'
-        else:
-            overall_status = 'NORMAL'
+        return AnomalyDetector._summarize(machine_data, anomalies)
+
+    @staticmethod
+    def scan_machines(machines: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Struct-of-arrays fleet scan: one kernel call, no per-anomaly dicts.
+
+        Returns:
+            (status_codes, flags) int32 arrays aligned with `machines`; see
+            `detect_anomalies_kernel`. Expand a flag word with `triggered`.
+        """
+        # AoS -> SoA once, then a single kernel call for the whole fleet
+        temps, rpms, torques, wears = (
+            np.array([m.get(key) or 0 for m in machines], dtype=np.float64)
+            for key in ('temperature', 'rpm', 'torque', 'tool_wear')
+        )
+        return detect_anomalies_kernel(temps, rpms, torques, wears)
+
+    @staticmethod
+    def triggered(flags: int, torque: float) -> List[Tuple[str, str]]:
+        """(code, severity) for each bit set in a kernel flag word, in rule order."""
+        torque_max = AnomalyDetector.NORMAL_TORQUE_MAX
+        found = []
+        for bit, (code, severity) in enumerate(AnomalyDetector.ANOMALY_BITS):
+            if flags >> bit & 1:
+                if severity is None:
+                    severity = 'CRITICAL' if torque > torque_max * 1.5 else 'HIGH'
+                found.append((code, severity))
+        return found
+
+    @staticmethod
+    def description_fields(sensor_data: Dict) -> Dict:
+        """Values for the `ANOMALY_INFO` description placeholders of one machine."""
+        temp_k = float(sensor_data.get('temperature') or 0.0)
+        return {
+            'temp_c': temp_k - 273.15,
+            'temp_k': temp_k,
+            'rpm': sensor_data.get('rpm') or 0,
+            'torque': sensor_data.get('torque') or 0,
+            'tool_wear': sensor_data.get('tool_wear') or 0,
+            'issue': 'below' if temp_k < AnomalyDetector.NORMAL_TEMP_MIN else 'above',
+            'limit_c': AnomalyDetector.THERMAL_RUNAWAY_LIMIT_C,
+            'limit': AnomalyDetector.TOOL_WEAR_LIMIT,
+        }
+
+    @staticmethod
+    def _summarize(machine_data: Dict, anomalies: List[Dict]) -> Dict:
+        # Determine overall status from the worst severity (single pass)
+        worst = max((AnomalyDetector.SEVERITY_RANK.get(a['severity'], 1) for a in anomalies), default=0)
+        overall_status = AnomalyDetector.OVERALL_STATUS[worst]
         
         return {
             'machine_id': machine_data.get('machine_id'),
@@ -170,3 +244,86 @@ class AnomalyDetector:
             'anomaly_count': len(anomalies),
             'timestamp': machine_data.get('timestamp', datetime.now())
         }
+
+
+# --- Fleet kernel -----------------------------------------------------------
+# Thresholds as module globals: numba freezes them into the compiled kernel.
+_PRINTING_TEMP_MIN_K = AnomalyDetector.PRINTING_TEMP_MIN_K
+_RUNAWAY_LIMIT_K = AnomalyDetector.THERMAL_RUNAWAY_LIMIT_K
+_TEMP_MIN = AnomalyDetector.NORMAL_TEMP_MIN
+_TEMP_MAX = AnomalyDetector.NORMAL_TEMP_MAX
+_RPM_MIN = AnomalyDetector.NORMAL_RPM_MIN
+_RPM_MAX = AnomalyDetector.NORMAL_RPM_MAX
+_TORQUE_MAX = AnomalyDetector.NORMAL_TORQUE_MAX
+_TOOL_WEAR_LIMIT = AnomalyDetector.TOOL_WEAR_LIMIT
+
+
+def _detect_anomalies_numpy(temps, rpms, torques, wears):
+    """NumPy fallback for `detect_anomalies_kernel` when numba is not installed."""
+    masks = (
+        (rpms > 0) & (temps >= _PRINTING_TEMP_MIN_K) & (temps < _RUNAWAY_LIMIT_K),
+        (temps > _TEMP_MIN) & (rpms == 0),
+        torques > _TORQUE_MAX,
+        (temps < _TEMP_MIN) | (temps > _TEMP_MAX),
+        wears > _TOOL_WEAR_LIMIT,
+        (rpms > 0) & ((rpms < _RPM_MIN) | (rpms > _RPM_MAX)),
+    )
+    flags = np.zeros(temps.shape[0], dtype=np.int32)
+    for bit, mask in enumerate(masks):
+        flags |= mask.astype(np.int32) << bit
+    status_codes = np.maximum.reduce([
+        masks[0] * 3,
+        masks[1] * 2,
+        np.where(masks[2], np.where(torques > _TORQUE_MAX * 1.5, 3, 2), 0),
+        masks[3] | masks[4] | masks[5],
+    ]).astype(np.int32)
+    return status_codes, flags
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def detect_anomalies_kernel(temps, rpms, torques, wears):
+        """
+        Evaluate every threshold rule for a fleet of machines in one compiled pass.
+
+        Args:
+            temps, rpms, torques, wears: float64 arrays, one entry per machine
+
+        Returns:
+            (status_codes, flags): int32 arrays; status_codes indexes
+            `AnomalyDetector.OVERALL_STATUS`, bit i of flags is `ANOMALY_BITS[i]`
+        """
+        n = temps.shape[0]
+        status_codes = np.zeros(n, dtype=np.int32)
+        flags = np.zeros(n, dtype=np.int32)
+        for i in prange(n):
+            t = temps[i]
+            r = rpms[i]
+            q = torques[i]
+            f = 0
+            worst = 0
+            if r > 0 and t >= _PRINTING_TEMP_MIN_K and t < _RUNAWAY_LIMIT_K:
+                f |= 1
+                worst = 3
+            if t > _TEMP_MIN and r == 0:
+                f |= 2
+                worst = max(worst, 2)
+            if q > _TORQUE_MAX:
+                f |= 4
+                worst = max(worst, 3 if q > _TORQUE_MAX * 1.5 else 2)
+            if t < _TEMP_MIN or t > _TEMP_MAX:
+                f |= 8
+            if wears[i] > _TOOL_WEAR_LIMIT:
+                f |= 16
+            if r > 0 and (r < _RPM_MIN or r > _RPM_MAX):
+                f |= 32
+            if f & 56:
+                worst = max(worst, 1)
+            flags[i] = f
+            status_codes[i] = worst
+        return status_codes, flags
+
+    # Warm up at import so the first fleet scan doesn't pay the JIT compile
+    detect_anomalies_kernel(*(np.zeros(1) for _ in range(4)))
+else:
+    detect_anomalies_kernel = _detect_anomalies_numpy
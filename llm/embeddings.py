@@ -0,0 +1,74 @@
+"""
+BGE embedding model shared by the RAG tool (`lookup_manual`) and the manual ingest script.
+
+Prefers an int8-quantized ONNX Runtime export of bge-base-en-v1.5 when one is present,
+falling back to the FP32 HuggingFace/PyTorch model otherwise. Build the ONNX model once:
+
+    optimum-cli export onnx --model BAAI/bge-base-en-v1.5 models/bge-onnx/
+    optimum-cli onnxruntime quantize --onnx_model models/bge-onnx/ -o models/bge-onnx-int8/ --avx512_vnni
+
+IMPORTANT: ingest and query must use the same backend, otherwise query vectors won't
+line up with the stored ones. Re-run `scripts/ingest_vectors.py` after switching.
+"""
+import os
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "BAAI/bge-base-en-v1.5"
+ONNX_MODEL_DIR = os.getenv("BGE_ONNX_DIR", "models/bge-onnx-int8")
+
+
+class OnnxBGEEmbeddings(Embeddings):
+    """LangChain-compatible BGE embeddings running on ONNX Runtime (int8 quantized)."""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, batch_size: int = 32):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        self.model_name = f"{EMBEDDING_MODEL} (onnx-int8)"
+        self.batch_size = batch_size
+        # `optimum-cli onnxruntime quantize` output has no tokenizer files; use the hub model's
+        self._tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL)
+        self._model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name="model_quantized.onnx")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            inputs = self._tokenizer(
+                texts[i:i + self.batch_size], padding=True, truncation=True, max_length=512, return_tensors="np"
+            )
+            hidden = self._model(**inputs).last_hidden_state
+            vectors.append(np.asarray(hidden)[:, 0])  # BGE uses CLS pooling
+        x = np.concatenate(vectors).astype(np.float32)
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+# --- OPTIMIZATION: Load Embedding Model Once ---
+_embedding_model = None
+def get_embedding_model() -> Embeddings:
+    global _embedding_model
+    if _embedding_model is None:
+        if os.path.isdir(ONNX_MODEL_DIR):
+            try:
+                _embedding_model = OnnxBGEEmbeddings()
+            except Exception as e:  # missing optimum/onnxruntime, incomplete export, ...
+                print(f"⚠️ Could not load ONNX model from {ONNX_MODEL_DIR} ({e}); using PyTorch BGE.")
+        if _embedding_model is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            _embedding_model = HuggingFaceEmbeddings(
+                model_name=EMBEDDING_MODEL,
+                model_kwargs={'device': 'cpu'},
+                # batch_size=32 keeps each transformer forward pass CPU-cache friendly
+                encode_kwargs={'normalize_embeddings': True, 'batch_size': 32}
+            )
+    return _embedding_model
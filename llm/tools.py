@@ -1,35 +1,130 @@
 import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import chromadb
+from chromadb.config import Settings
 from langchain_core.tools import tool
-from langchain_huggingface import HuggingFaceEmbeddings
 from .anomaly_detector import AnomalyDetector
+from .embeddings import get_embedding_model
 
 API_URL = "http://127.0.0.1:8000"
+API_TIMEOUT = 5  # seconds
 
-# --- OPTIMIZATION: Load Embedding Model Once ---
-# Using bge-base-en-v1.5 as specified in requirements
-_embedding_model = None
-def get_embedding_model():
-    global _embedding_model
-    if _embedding_model is None:
-        _embedding_model = HuggingFaceEmbeddings(
-            model_name="BAAI/bge-base-en-v1.5",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
+# --- OPTIMIZATION: Keep-alive HTTP session for API calls ---
+# Agent loops call the status tools repeatedly; a shared Session reuses pooled
+# TCP connections to the FastAPI service instead of reconnecting per request.
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2, allowed_methods=["GET"]),
+))
+
+# --- OPTIMIZATION: Semantic Cache for Manual Lookups ---
+# Agents ask about the same error codes over and over ("FF-001 fan failure").
+# Cache responses by normalized query; on an exact miss, reuse the response of a
+# cached query whose embedding is near-identical (BGE vectors are L2-normalized,
+# so a dot product is the cosine similarity). LRU-bounded.
+MANUAL_CACHE_SIZE = 512
+MANUAL_CACHE_MIN_SIMILARITY = 0.97
+_manual_cache = OrderedDict()  # normalized query -> (embedding, response)
+_manual_cache_index = None      # (keys, stacked embeddings), rebuilt lazily after changes
+# Streamlit runs each session's script in its own thread; guard all cache state.
+_manual_cache_lock = threading.Lock()
+
+def _manual_cache_get(key: str):
+    with _manual_cache_lock:
+        entry = _manual_cache.get(key)
+        if entry is None:
+            return None
+        _manual_cache.move_to_end(key)
+        return entry[1]
+
+def _manual_cache_get_similar(query_vec: np.ndarray):
+    global _manual_cache_index
+    with _manual_cache_lock:
+        if not _manual_cache:
+            return None
+        if _manual_cache_index is None:
+            # Keys and rows from one snapshot so they can't drift apart
+            items = list(_manual_cache.items())
+            _manual_cache_index = ([k for k, _ in items], np.stack([vec for _, (vec, _) in items]))
+        keys, matrix = _manual_cache_index
+    scores = matrix @ query_vec
+    best = int(np.argmax(scores))
+    if scores[best] < MANUAL_CACHE_MIN_SIMILARITY:
+        return None
+    return _manual_cache_get(keys[best])  # None if evicted meanwhile
+
+def _manual_cache_put(key: str, query_vec: np.ndarray, response: str):
+    global _manual_cache_index
+    with _manual_cache_lock:
+        _manual_cache[key] = (query_vec, response)
+        _manual_cache.move_to_end(key)
+        if len(_manual_cache) > MANUAL_CACHE_SIZE:
+            _manual_cache.popitem(last=False)
+        _manual_cache_index = None
+
+# --- OPTIMIZATION: Reuse one Chroma client/collection handle ---
+# HttpClient() heartbeats the server and get_collection() fetches metadata;
+# do both once instead of on every lookup_manual call.
+CHROMA_HOST = "localhost"
+CHROMA_PORT = 8001
+MANUAL_COLLECTION = "technical_manuals"
+MANUAL_CANDIDATES = 20  # nearest neighbours fetched from Chroma
+MANUAL_TOP_K = 3        # excerpts returned to the agent
+_chroma_collection = None
+
+def _get_collection():
+    global _chroma_collection
+    if _chroma_collection is None:
+        client = chromadb.HttpClient(
+            host=CHROMA_HOST, port=CHROMA_PORT,
+            settings=Settings(anonymized_telemetry=False),
         )
-    return _embedding_model
+        _chroma_collection = client.get_collection(name=MANUAL_COLLECTION)
+    return _chroma_collection
+
+def _reset_collection():
+    """Drop the cached handle (e.g. Chroma restarted or the collection was re-ingested)."""
+    global _chroma_collection
+    _chroma_collection = None
 
 # --- TOOL 1: SPECIFIC CHECK ---
-# llm/tools.py
+# Response templates are parsed once at import; parts are joined with "\n".
+HEADER_TEMPLATE = (
+    "Machine ID: {machine_id}\n"
+    "Model: {model_name}\n"
+    "Status: {status}\n"
+    "--- SENSOR READINGS ---\n"
+    "Temperature: {temperature} K (Normal: 300-315 K)\n"
+    "RPM: {rpm} (Normal: 1200-1800)\n"
+    "Torque: {torque} Nm (Normal: 40-60 Nm)\n"
+    "Tool Wear: {tool_wear} min (Limit: 200 min)\n"
+)
+ANOM_TEMPLATE = (
+    "[{severity}] {type} ({code})\n"
+    "Description: {description}\n"
+    "Action: {recommended_action}\n"
+)
 
-# llm/tools.py
+class _MissingAsNone(dict):
+    """format_map() mapping that renders missing API fields as None, like data.get()."""
+    def __missing__(self, key):
+        return None
 
 @tool
 def check_machine_status(machine_id: int):
     """Checks the status of a SPECIFIC machine by its ID and performs autonomous anomaly detection."""
     try:
-        response = requests.get(f"{API_URL}/machines/{machine_id}")
+        response = _SESSION.get(f"{API_URL}/machines/{machine_id}", timeout=API_TIMEOUT)
         
         if response.status_code == 404:
             return f"Status: Machine {machine_id} does not exist. Stop."
@@ -43,34 +138,92 @@ def check_machine_status(machine_id: int):
             analysis = AnomalyDetector.analyze_machine(data)
             
             # Build response with sensor readings and detected anomalies
-            response_text = (
-                f"Machine ID: {machine_id}\n"
-                f"Model: {data.get('model_name')}\n"
-                f"Status: {analysis['status']}\n"
-                f"--- SENSOR READINGS ---\n"
-                f"Temperature: {data.get('temperature')} K (Normal: 300-315 K)\n"
-                f"RPM: {data.get('rpm')} (Normal: 1200-1800)\n"
-                f"Torque: {data.get('torque')} Nm (Normal: 40-60 Nm)\n"
-                f"Tool Wear: {data.get('tool_wear')} min (Limit: 200 min)\n"
-            )
+            # (collect parts and join once instead of repeated string concatenation)
+            fields = _MissingAsNone(data, machine_id=machine_id, status=analysis['status'])
+            parts = [HEADER_TEMPLATE.format_map(fields)]
             
             # Add anomaly details if any detected
             if analysis['anomalies']:
-                response_text += f"\n--- DETECTED ANOMALIES ({analysis['anomaly_count']}) ---\n"
+                parts.append(f"--- DETECTED ANOMALIES ({analysis['anomaly_count']}) ---\n")
                 for anomaly in analysis['anomalies']:
-                    response_text += (
-                        f"\n[{anomaly['severity']}] {anomaly['type']} ({anomaly['code']})\n"
-                        f"Description: {anomaly['description']}\n"
-                        f"Action: {anomaly['recommended_action']}\n"
-                    )
+                    parts.append(ANOM_TEMPLATE.format_map(anomaly))
             else:
-                response_text += "\n✓ No anomalies detected. All sensors within normal parameters.\n"
+                parts.append("✓ No anomalies detected. All sensors within normal parameters.\n")
             
-            return response_text
+            return "\n".join(parts)
         return f"Error: API status {response.status_code}"
     except Exception as e:
         return f"Connection Error: {str(e)}"
 
+# Function-call JSON that sometimes leaks into tool input, e.g. <function=lookup_manual>{"query": "..."}
+_FUNC_CALL_RE = re.compile(r'\{[^}]+\}')
+
+def _sanitize_query(query) -> str:
+    """Recover the query text when the LLM passes a dict, non-string or leaked function-call syntax."""
+    # Handle case where query might be passed incorrectly
+    # Sometimes LLM tries to pass dict or other formats
+    if isinstance(query, dict):
+        # Extract query from dict if LLM passes it that way
+        query = query.get('query', query.get('text', str(query)))
+    
+    # Clean up the query string
+    query = str(query).strip()
+    
+    # Remove any function call syntax that might have leaked in
+    if 'function=' in query:
+        # Extract just the JSON part if present
+        json_match = _FUNC_CALL_RE.search(query)
+        if json_match:
+            try:
+                query_dict = json.loads(json_match.group())
+                query = query_dict.get('query', str(query_dict))
+            except ValueError:
+                query = query.split('}')[-1].strip('"').strip("'")
+    
+    return str(query).strip()
+
+def _search_manual(query: str) -> str:
+    """Semantic-cached vector search over the technical manuals for a clean query string."""
+    cache_key = query.lower()
+    cached = _manual_cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    model = get_embedding_model()
+    query_vec = np.asarray(model.embed_query(query), dtype=np.float32)
+
+    cached = _manual_cache_get_similar(query_vec)
+    if cached is not None:
+        return cached
+
+    collection = _get_collection()
+    
+    # Over-fetch candidates from the HNSW index (better recall on a growing
+    # corpus); Chroma returns them sorted by exact distance, so keep the first 3
+    results = collection.query(
+        query_embeddings=[query_vec.tolist()],
+        n_results=MANUAL_CANDIDATES,
+        include=["documents", "metadatas"],
+    )
+    
+    if not results: return "No results found in technical manual."
+    docs = results.get('documents')
+    metadatas = results.get('metadatas') or []
+    
+    if not docs or not docs[0]: return "No manual entry found for this query."
+    
+    # Combine multiple results if available
+    response = "Technical Manual Excerpts:\n\n"
+    for i, doc in enumerate(docs[0][:MANUAL_TOP_K]):
+        page_info = ""
+        if metadatas and metadatas[0] and i < len(metadatas[0]):
+            page = metadatas[0][i].get('page', 'Unknown')
+            page_info = f" [Page {page}]"
+        response += f"--- Excerpt {i+1}{page_info} ---\n{doc}\n\n"
+        
+    _manual_cache_put(cache_key, query_vec, response)
+    return response
+
 # --- TOOL 2: MANUAL LOOKUP ---
 @tool
 def lookup_manual(query: str) -> str:
@@ -86,76 +239,50 @@ def lookup_manual(query: str) -> str:
         Technical manual excerpts with repair procedures
     """
     try:
-        # Handle case where query might be passed incorrectly
-        # Sometimes LLM tries to pass dict or other formats
-        if isinstance(query, dict):
-            # Extract query from dict if LLM passes it that way
-            query = query.get('query', query.get('text', str(query)))
-        elif not isinstance(query, str):
-            # Convert to string if it's not already
-            query = str(query)
-        
-        # Clean up the query string
-        query = str(query).strip()
-        
-        # Remove any function call syntax that might have leaked in
-        if query.startswith('<function=') or 'function=' in query:
-            # Extract just the JSON part if present
-            import re
-            json_match = re.search(r'\{[^}]+\}', query)
-            if json_match:
-                import json
-                try:
-                    query_dict = json.loads(json_match.group())
-                    query = query_dict.get('query', str(query_dict))
-                except:
-                    query = query.split('}')[-1].strip('"').strip("'")
+        # Fast path: a plain string query (the common case) needs no sanitizing
+        if isinstance(query, str) and 'function=' not in query:
+            query = query.strip()
+        else:
+            query = _sanitize_query(query)
         
-        if not query or not query.strip():
+        if not query:
             return "Error: Query must be a non-empty string. Provide the error code or issue description."
         
-        query = str(query).strip()
-
-        client = chromadb.HttpClient(host='localhost', port=8001)  # Updated port
-        collection = client.get_collection(name="technical_manuals")
-        
-        model = get_embedding_model()
-        query_vec = model.embed_query(query)
-        
-        # Retrieve top 3 results for better context
-        results = collection.query(query_embeddings=[query_vec], n_results=3)
-        
-        if not results: return "No results found in technical manual."
-        docs = results.get('documents')
-        metadatas = results.get('metadatas', [])
-        
-        if not docs or not docs[0]: return "No manual entry found for this query."
-        
-        # Combine multiple results if available
-        response = "Technical Manual Excerpts:\n\n"
-        for i, doc in enumerate(docs[0][:3]):  # Limit to 3 results
-            page_info = ""
-            if metadatas and metadatas[0] and i < len(metadatas[0]):
-                page = metadatas[0][i].get('page', 'Unknown')
-                page_info = f" [Page {page}]"
-            response += f"--- Excerpt {i+1}{page_info} ---\n{doc}\n\n"
-            
-        return response
+        return _search_manual(query)
     except Exception as e:
+        _reset_collection()  # reconnect on the next call
         return f"Manual Search Error: {str(e)}" 
 
 # --- TOOL 3: SMART SCAN (ARMORED) ---
 # return_direct=True is important: for "check all machines" we want to return the scan
 # output directly, and *not* have the LLM attempt additional tool calls (like lookup_manual),
 # which can be fragile and may fail tool-call generation.
+# Back-to-back agent turns ("any errors?" then "how are all machines?") reuse the
+# last successful scan report for a couple of seconds instead of re-hitting the API.
+SCAN_CACHE_TTL = 2.0  # seconds
+_scan_cache = (0.0, None)  # (monotonic time, report)
+
+# Report line per (code, severity), built once from the detector catalogue;
+# only the description placeholders are filled per machine.
+ANOM_FMT = {
+    (code, severity): f"  [{severity}] {anomaly_type} ({code})\n    Description: {description}\n"
+    for code, (anomaly_type, description, _) in AnomalyDetector.ANOMALY_INFO.items()
+    for severity in AnomalyDetector.SEVERITY_RANK
+}
+
 @tool(return_direct=True)
 def scan_for_failures(dummy: str = ""):
     """
     Scans the ENTIRE plant and performs autonomous anomaly detection on all machines.
     Use for 'How are all machines?' or 'Any errors?'.
     """
+    global _scan_cache
+    cached_at, cached_report = _scan_cache
+    if cached_report is not None and time.monotonic() - cached_at < SCAN_CACHE_TTL:
+        return cached_report
+
     try:
-        response = requests.get(f"{API_URL}/machines/status")
+        response = _SESSION.get(f"{API_URL}/machines/status", timeout=API_TIMEOUT)
         
         if response.status_code == 200:
             data = response.json()
@@ -167,47 +294,48 @@ def scan_for_failures(dummy: str = ""):
                 return f"Error: API returned unexpected format: {type(data)}"
             # -------------------------------------------
 
-            # Perform anomaly detection on all machines
-            all_analyses = []
-            for machine in data:
-                analysis = AnomalyDetector.analyze_machine(machine)
-                all_analyses.append(analysis)
+            # Perform anomaly detection on all machines (one kernel pass, SoA results)
+            status_codes, flags = AnomalyDetector.scan_machines(data)
             
-            # Filter machines with anomalies
-            machines_with_issues = [a for a in all_analyses if a['anomaly_count'] > 0]
+            # Indices of machines with anomalies (their original sensor data stays in `data`)
+            machines_with_issues = np.flatnonzero(flags)
             
-            if not machines_with_issues:
-                return "✓ All machines are functioning normally. No anomalies detected."
+            if not machines_with_issues.size:
+                report = "✓ All machines are functioning normally. No anomalies detected."
+                _scan_cache = (time.monotonic(), report)
+                return report
             
             # Build detailed report with ACTUAL sensor values for each machine
-            report = f"⚠️ {len(machines_with_issues)} MACHINE(S) WITH ISSUES:\n\n"
-            for analysis in machines_with_issues[:10]:  # Limit to 10 machines to avoid token overflow
-                # Find the original machine data to get sensor values
-                machine_data = next((m for m in data if m.get('machine_id') == analysis['machine_id']), None)
-                
-                report += f"--- Machine {analysis['machine_id']} ({analysis['model_name']}) ---\n"
-                report += f"Status: {analysis['status']}\n"
+            # (collect parts and join once instead of repeated string concatenation)
+            parts = [f"⚠️ {len(machines_with_issues)} MACHINE(S) WITH ISSUES:\n\n"]
+            for i in machines_with_issues[:10].tolist():  # Limit to 10 machines to avoid token overflow
+                machine_data = data[i]
+                fields = AnomalyDetector.description_fields(machine_data)
+                triggered = AnomalyDetector.triggered(int(flags[i]), fields['torque'])
+                parts.append(f"--- Machine {machine_data.get('machine_id')} ({machine_data.get('model_name', 'Unknown')}) ---\n")
+                parts.append(f"Status: {AnomalyDetector.OVERALL_STATUS[status_codes[i]]}\n")
                 
                 # Include ACTUAL sensor values
-                if machine_data:
-                    report += f"SENSOR READINGS:\n"
-                    report += f"  Temperature: {machine_data.get('temperature', 'N/A')} K (Normal: 300-315 K)\n"
-                    report += f"  RPM: {machine_data.get('rpm', 'N/A')} (Normal: 1200-1800)\n"
-                    report += f"  Torque: {machine_data.get('torque', 'N/A')} Nm (Normal: 40-60 Nm)\n"
-                    report += f"  Tool Wear: {machine_data.get('tool_wear', 'N/A')} min (Limit: 200 min)\n"
+                parts.append(
+                    f"SENSOR READINGS:\n"
+                    f"  Temperature: {machine_data.get('temperature', 'N/A')} K (Normal: 300-315 K)\n"
+                    f"  RPM: {machine_data.get('rpm', 'N/A')} (Normal: 1200-1800)\n"
+                    f"  Torque: {machine_data.get('torque', 'N/A')} Nm (Normal: 40-60 Nm)\n"
+                    f"  Tool Wear: {machine_data.get('tool_wear', 'N/A')} min (Limit: 200 min)\n"
+                )
                 
-                # List anomalies with codes
-                report += f"DETECTED ANOMALIES ({analysis['anomaly_count']}):\n"
-                for anomaly in analysis['anomalies']:
-                    report += f"  [{anomaly['severity']}] {anomaly['type']} ({anomaly['code']})\n"
-                    report += f"    Description: {anomaly['description']}\n"
-                report += "\n"
+                # List anomalies with codes (precomputed lines; only descriptions are filled in)
+                parts.append(f"DETECTED ANOMALIES ({len(triggered)}):\n")
+                parts.extend(ANOM_FMT[key].format_map(fields) for key in triggered)
+                parts.append("\n")
             
             if len(machines_with_issues) > 10:
-                report += f"... and {len(machines_with_issues) - 10} more machines with issues.\n"
+                parts.append(f"... and {len(machines_with_issues) - 10} more machines with issues.\n")
             
+            report = "".join(parts)
+            _scan_cache = (time.monotonic(), report)
             return report
             
         return f"Error: Could not scan. API Status: {response.status_code}"
     except Exception as e:
-        return f"Scan Error: {str(e)}"
\ No newline at end of file
+        return f"Scan Error: {str(e)}"
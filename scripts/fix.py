@@ -21,5 +21,19 @@ def add_missing_column():
         # If the column already exists, this catches the error
         print(f"⚠️  Note: {e}")
 
+def add_sensor_log_index():
+    # The latest-reading query (GROUP BY machine_id + MAX(timestamp)) and the
+    # dashboard history query both seek on (machine_id, timestamp).
+    # Databases created before init.sql/models.py declared it lack this index.
+    print("🔧 Ensuring index 'idx_machine_time' exists on 'sensor_logs'...")
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_machine_time ON sensor_logs (machine_id, timestamp);"))
+            conn.commit()
+        print("✅ SUCCESS: Index 'idx_machine_time' is in place!")
+    except Exception as e:
+        print(f"⚠️  Note: {e}")
+
 if __name__ == "__main__":
-    add_missing_column()
\ No newline at end of file
+    add_missing_column()
+    add_sensor_log_index()
\ No newline at end of file
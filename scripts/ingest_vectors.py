@@ -1,15 +1,57 @@
 import os
+import sys
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import chromadb
 # UPGRADE 1: Use PyMuPDFLoader (Better layout/table detection)
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
+
+# Add the root folder to Python's path so 'llm' is importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Same embedding backend as the lookup_manual tool (ONNX int8 if exported, else PyTorch)
+from llm.embeddings import get_embedding_model
 
 # CONFIG
 PDF_PATH = "data/printer_manual.pdf"
 CHROMA_HOST = "localhost"
 CHROMA_PORT = 8001  # Updated to match docker-compose port mapping
 COLLECTION_NAME = "technical_manuals"
+EMBED_CACHE_PATH = "data/embed_cache.db"  # chunk embeddings reused across re-ingests
+
+def open_embed_cache(path: str = EMBED_CACHE_PATH) -> sqlite3.Connection:
+    cache = sqlite3.connect(path)
+    cache.execute("CREATE TABLE IF NOT EXISTS embed_cache (hash BLOB PRIMARY KEY, vec BLOB)")
+    return cache
+
+def embed_with_cache(embedding_model, cache: sqlite3.Connection, texts: list) -> tuple:
+    """
+    Embed `texts`, only running the model on chunks not already in the cache.
+
+    Returns:
+        (embeddings in the same order as `texts`, number of newly embedded chunks)
+    """
+    # Key on model + text so switching models/backends never returns stale vectors
+    model_name = embedding_model.model_name
+    hashes = [hashlib.sha256(f"{model_name}\0{text}".encode()).digest() for text in texts]
+    placeholders = ",".join("?" * len(hashes))
+    rows = cache.execute(f"SELECT hash, vec FROM embed_cache WHERE hash IN ({placeholders})", hashes)
+    vectors = {h: np.frombuffer(vec, dtype=np.float32) for h, vec in rows}
+
+    misses = {h: text for h, text in zip(hashes, texts) if h not in vectors}
+    if misses:
+        new_vecs = embedding_model.embed_documents(list(misses.values()))
+        for h, vec in zip(misses, new_vecs):
+            vectors[h] = np.asarray(vec, dtype=np.float32)
+        cache.executemany(
+            "INSERT OR IGNORE INTO embed_cache (hash, vec) VALUES (?, ?)",
+            [(h, vectors[h].tobytes()) for h in misses],
+        )
+        cache.commit()
+    return [vectors[h].tolist() for h in hashes], len(misses)
 
 def ingest():
     if not os.path.exists(PDF_PATH):
@@ -36,11 +78,8 @@ def ingest():
 
     print("3. 🧠 Generating Embeddings...")
     # Using bge-base-en-v1.5 as specified in requirements
-    embedding_model = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-base-en-v1.5",
-        model_kwargs={'device': 'cpu'},
-        encode_kwargs={'normalize_embeddings': True}
-    )
+    embedding_model = get_embedding_model()
+    print(f"   Model: {embedding_model.model_name}")
     
     print(f"4. 🔌 Connecting to ChromaDB at {CHROMA_HOST}:{CHROMA_PORT}...")
     try:
@@ -62,21 +101,38 @@ def ingest():
     print("5. 💾 Uploading Vectors (This may take a moment)...")
     
     # Batch Processing (More robust for large files)
-    BATCH_SIZE = 100
+    # 166 items per `add` is Chroma's recommended payload size. Embedding (CPU) and
+    # uploading (HTTP) are pipelined: batch N uploads in the background while
+    # batch N+1 is embedded on the main thread (which owns the SQLite cache).
+    BATCH_SIZE = 166
     total_chunks = len(chunks)
+    total_batches = (total_chunks + BATCH_SIZE - 1) // BATCH_SIZE
+    cache = open_embed_cache()
+    embedded = 0
+    pending = None
     
-    for i in range(0, total_chunks, BATCH_SIZE):
-        batch = chunks[i : i + BATCH_SIZE]
-        
-        ids = [f"doc_{j}" for j in range(i, i + len(batch))]
-        documents = [chunk.page_content for chunk in batch]
-        metadatas = [{"source": "manual", "page": chunk.metadata.get('page', 0)} for chunk in batch]
-        
-        # Embed and Add
-        embeddings = embedding_model.embed_documents(documents)
-        collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
-        print(f"   -> Processed batch {i // BATCH_SIZE + 1} / {(total_chunks // BATCH_SIZE) + 1}")
+    with ThreadPoolExecutor(max_workers=1) as uploader:
+        for i in range(0, total_chunks, BATCH_SIZE):
+            batch = chunks[i : i + BATCH_SIZE]
+            
+            ids = [f"doc_{j}" for j in range(i, i + len(batch))]
+            documents = [chunk.page_content for chunk in batch]
+            metadatas = [{"source": "manual", "page": chunk.metadata.get('page', 0)} for chunk in batch]
+            
+            # Embed (unchanged chunks come from the cache) while the previous batch uploads
+            embeddings, misses = embed_with_cache(embedding_model, cache, documents)
+            embedded += misses
+            if pending:
+                pending.result()  # surface upload errors, keep at most one batch in flight
+            pending = uploader.submit(
+                collection.add, ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas
+            )
+            print(f"   -> Processed batch {i // BATCH_SIZE + 1} / {total_batches}")
+        if pending:
+            pending.result()
 
+    cache.close()
+    print(f"   ♻️  Embedded {embedded} new chunks, reused {total_chunks - embedded} from cache.")
     print(f"✅ SUCCESS: {total_chunks} knowledge chunks ingested.")
 
 if __name__ == "__main__":
@@ -2,16 +2,18 @@
 Sensor Stream Simulator
 Processes CSV data as "live" time-shifted events to simulate real-time IoT stream.
 """
-import csv
 import time
 import random
 import os
+import queue
+import threading
 from datetime import datetime, timedelta
 from typing import Optional
-import mysql.connector
+from mysql.connector import pooling
 from sqlmodel import Session, select
 from database.connection import engine
 from database.models import SensorLog, Machine
+from utils.sensor_csv import load_sensor_csv
 
 # Configuration
 CSV_PATH = "data/real_sensors.csv"
@@ -23,6 +25,8 @@ DB_CONFIG = {
     'port': 3306
 }
 
+STREAM_COLUMNS = ['air_temp_k', 'process_temp_k', 'rpm', 'torque_nm', 'tool_wear_min', 'target', 'failure_type']
+
 # Time-shifting configuration
 TIME_ACCELERATION = 1.0  # 1.0 = real-time, 10.0 = 10x faster
 BASE_TIME_OFFSET_DAYS = 30  # Start simulation from 30 days ago
@@ -38,30 +42,71 @@ def get_machine_ids() -> list:
         print(f"Warning: Could not fetch machine IDs: {e}")
         return list(range(1, 11))
 
-def insert_sensor_log(machine_id: int, timestamp: datetime, air_temp: float, 
-                      proc_temp: float, rpm: float, torque: float, 
-                      tool_wear: float, target: int, failure_type: str):
-    """Insert a sensor log entry into the database (Raw SQL for speed)."""
+INSERT_QUERY = """
+INSERT INTO sensor_logs 
+(machine_id, timestamp, air_temp_k, process_temp_k, rpm, torque_nm, tool_wear_min, target, failure_type)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Buffered writes: flush every FLUSH_ROWS rows or FLUSH_SECONDS, whichever comes first
+FLUSH_ROWS = 100
+FLUSH_SECONDS = 2.0
+QUEUE_SIZE = 1024
+_STOP = object()  # writer thread shutdown sentinel
+
+_pool = None
+def get_pool() -> pooling.MySQLConnectionPool:
+    """Shared connection pool (avoids a TCP handshake + auth per insert)."""
+    global _pool
+    if _pool is None:
+        _pool = pooling.MySQLConnectionPool(pool_name="sensor_stream", pool_size=4, **DB_CONFIG)
+    return _pool
+
+def insert_sensor_logs(rows: list) -> bool:
+    """Insert buffered sensor log tuples in one executemany + commit (Raw SQL for speed)."""
+    if not rows:
+        return True
+    conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = get_pool().get_connection()
         cursor = conn.cursor()
-        
-        query = """
-        INSERT INTO sensor_logs 
-        (machine_id, timestamp, air_temp_k, process_temp_k, rpm, torque_nm, tool_wear_min, target, failure_type)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(query, (
-            machine_id, timestamp, air_temp, proc_temp, rpm, torque, tool_wear, target, failure_type
-        ))
+        cursor.executemany(INSERT_QUERY, rows)
         conn.commit()
         cursor.close()
-        conn.close()
         return True
     except Exception as e:
-        print(f"Error inserting log: {e}")
+        print(f"Error inserting {len(rows)} logs: {e}")
         return False
+    finally:
+        if conn is not None:
+            conn.close()  # returns the connection to the pool
+
+# --- OPTIMIZATION: Parse the CSV once and keep it resident ---
+_records = {}
+def load_records(csv_file: str):
+    """Sensor rows as a NumPy record array, parsed on first use and cached per file."""
+    if csv_file not in _records:
+        _records[csv_file] = load_sensor_csv(csv_file)[STREAM_COLUMNS].to_records(index=False)
+    return _records[csv_file]
+
+def db_writer(rows: queue.Queue):
+    """Drain queued sensor rows into the DB with buffered executemany until _STOP arrives."""
+    buffer: list = []
+    last_flush = time.monotonic()
+    while True:
+        try:
+            item = rows.get(timeout=FLUSH_SECONDS)
+        except queue.Empty:
+            item = None
+        if item is _STOP:
+            break
+        if item is not None:
+            buffer.append(item)
+        if len(buffer) >= FLUSH_ROWS or (buffer and time.monotonic() - last_flush >= FLUSH_SECONDS):
+            insert_sensor_logs(buffer)
+            buffer.clear()
+            last_flush = time.monotonic()
+    insert_sensor_logs(buffer)  # flush whatever is still buffered
 
 def stream_csv_data(speed_multiplier: float = 1.0, start_from: Optional[int] = None):
     # Locate CSV dynamically based on execution path
@@ -80,71 +125,49 @@ def stream_csv_data(speed_multiplier: float = 1.0, start_from: Optional[int] = N
 
     machine_ids = get_machine_ids()
     base_time = datetime.now() - timedelta(days=BASE_TIME_OFFSET_DAYS)
+
+    # DB writes run on a background thread; this loop only enqueues and sleeps
+    pending: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    writer = threading.Thread(target=db_writer, args=(pending,), name="sensor-db-writer", daemon=True)
+    writer.start()
     
     try:
-        with open(csv_file, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f)
-            header = next(reader)  # Skip header
-            
-            # Fast-forward if requested
-            if start_from:
-                for _ in range(start_from):
-                    try:
-                        next(reader)
-                    except StopIteration:
-                        break
-            
-            row_count = start_from or 0
-            
-            for row in reader:
-                row_count += 1
-                try:
-                    # AI4I Dataset Mapping:
-                    # [3] Air Temp, [4] Process Temp, [5] RPM, [6] Torque, [7] Tool Wear, [8] Target
-                    air_temp = float(row[3])
-                    proc_temp = float(row[4])
-                    rpm = int(row[5])
-                    torque = float(row[6])
-                    wear = int(row[7])
-                    target = int(row[8])
-                    
-                    # Determine failure type string based on flags
-                    failure_type = "Normal"
-                    if target == 1:
-                        if len(row) > 9 and int(row[9]) == 1: failure_type = "Tool Wear Failure (TWF)"
-                        elif len(row) > 10 and int(row[10]) == 1: failure_type = "Heat Dissipation Failure (HDF)"
-                        elif len(row) > 11 and int(row[11]) == 1: failure_type = "Power Failure (PWF)"
-                        elif len(row) > 12 and int(row[12]) == 1: failure_type = "Overstrain Failure (OSF)"
-                        elif len(row) > 13 and int(row[13]) == 1: failure_type = "Random Failure (RNF)"
-                        else: failure_type = "Unknown Failure"
-                    
-                    machine_id = random.choice(machine_ids)
-                    
-                    # Shift time to "Now"
-                    minutes_offset = row_count * 5
-                    timestamp = base_time + timedelta(minutes=minutes_offset)
-                    
-                    success = insert_sensor_log(
-                        machine_id, timestamp, air_temp, proc_temp, 
-                        rpm, torque, wear, target, failure_type
-                    )
+        records = load_records(csv_file)
+        first_row = (start_from or 0) + 1
+        
+        for row_count, record in enumerate(records[start_from or 0:], start=first_row):
+            try:
+                # tolist() yields native Python values the MySQL driver can bind
+                air_temp, proc_temp, rpm, torque, wear, target, failure_type = record.tolist()
+                machine_id = random.choice(machine_ids)
+                
+                # Shift time to "Now"
+                minutes_offset = row_count * 5
+                timestamp = base_time + timedelta(minutes=minutes_offset)
+                
+                pending.put((
+                    machine_id, timestamp, air_temp, proc_temp,
+                    rpm, torque, wear, target, failure_type
+                ))
+                
+                if row_count % 10 == 0:
+                    status_icon = "🔥" if failure_type != "Normal" else "✓"
+                    print(f"   {status_icon} Row {row_count}: M{machine_id} | Temp: {proc_temp:.1f}K | RPM: {rpm}")
+                
+                # Wait logic
+                time.sleep((5 * 60) / 1000) # Fast playback by default for testing
                     
-                    if success:
-                        if row_count % 10 == 0:
-                            status_icon = "🔥" if failure_type != "Normal" else "✓"
-                            print(f"   {status_icon} Row {row_count}: M{machine_id} | Temp: {proc_temp:.1f}K | RPM: {rpm}")
-                        
-                        # Wait logic
-                        time.sleep((5 * 60) / 1000) # Fast playback by default for testing
-                        
-                except Exception as e:
-                    print(f"   ⚠️ Skipping row {row_count}: {e}")
-                    continue
+            except Exception as e:
+                print(f"   ⚠️ Skipping row {row_count}: {e}")
+                continue
 
     except FileNotFoundError:
         print(f"❌ Error: Could not find '{csv_file}'")
     except KeyboardInterrupt:
         print("\n⏸️  Stream stopped.")
+    finally:
+        pending.put(_STOP)
+        writer.join()
 
 if __name__ == "__main__":
-    stream_csv_data()
\ No newline at end of file
+    stream_csv_data()
@@ -0,0 +1,64 @@
+"""
+AI4I sensor CSV loader shared by the data import and stream simulator scripts.
+Parses the whole file in one vectorized pandas pass instead of per-cell float()/int().
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# AI4I Dataset Column Mapping:
+# [3] Air Temp, [4] Process Temp, [5] RPM, [6] Torque, [7] Tool Wear, [8] Target
+SENSOR_COLUMNS = {
+    3: 'air_temp_k',
+    4: 'process_temp_k',
+    5: 'rpm',
+    6: 'torque_nm',
+    7: 'tool_wear_min',
+    8: 'target',
+}
+# Binary failure flags: [9]TWF, [10]HDF, [11]PWF, [12]OSF, [13]RNF
+FAILURE_FLAGS = {
+    9: 'Tool Wear Failure (TWF)',
+    10: 'Heat Dissipation Failure (HDF)',
+    11: 'Power Failure (PWF)',
+    12: 'Overstrain Failure (OSF)',
+    13: 'Random Failure (RNF)',
+}
+# Lookup table for the failure_type column: one entry per flag, then the two fallbacks
+FAILURE_TYPES = np.array([*FAILURE_FLAGS.values(), 'Unknown Failure', 'Normal'])
+UNKNOWN_FAILURE = len(FAILURE_FLAGS)
+NORMAL = UNKNOWN_FAILURE + 1
+DTYPES = {3: 'float64', 4: 'float64', 5: 'int32', 6: 'float64', 7: 'int32',
+          8: 'int8', 9: 'int8', 10: 'int8', 11: 'int8', 12: 'int8', 13: 'int8'}
+
+
+def load_sensor_csv(path: str, nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load AI4I sensor rows with a derived `failure_type` column.
+
+    Args:
+        path: CSV file path
+        nrows: Max number of data rows to read (None = all)
+
+    Returns:
+        DataFrame with air_temp_k, process_temp_k, rpm, torque_nm, tool_wear_min,
+        target and failure_type columns
+    """
+    df = pd.read_csv(
+        path,
+        encoding='utf-8-sig',  # handles BOM if present in Excel-saved CSVs
+        header=None,
+        skiprows=1,  # header row
+        nrows=nrows,
+        usecols=list(DTYPES),
+        dtype=DTYPES,
+    )
+
+    # First raised flag wins (argmax returns the first max); failures with no
+    # flag raised are "Unknown Failure". One table lookup, no per-flag masks.
+    flags = df[list(FAILURE_FLAGS)].to_numpy()
+    idx = np.where(flags.any(axis=1), flags.argmax(axis=1), UNKNOWN_FAILURE)
+    idx[df[8].to_numpy() != 1] = NORMAL
+    df['failure_type'] = FAILURE_TYPES[idx]
+    return df.rename(columns=SENSOR_COLUMNS)[[*SENSOR_COLUMNS.values(), 'failure_type']]
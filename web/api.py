@@ -30,14 +30,23 @@ def health_check():
 def get_all_machines_status(session: Session = Depends(get_session)):
     try:
         # 1. Get latest log for each machine
+        # GROUP BY machine_id + MAX(timestamp) is a loose index scan on
+        # idx_machine_time (about one index lookup per machine).
         subquery = (
             select(SensorLog.machine_id, func.max(SensorLog.timestamp).label("max_time"))
             .group_by(SensorLog.machine_id).subquery()
         )
+        # Tie-break duplicate timestamps on the highest id so each machine
+        # appears once (index entries carry the primary key).
+        latest = (
+            select(func.max(SensorLog.id).label("log_id"))
+            .join(subquery, (SensorLog.machine_id == subquery.c.machine_id) & (SensorLog.timestamp == subquery.c.max_time))
+            .group_by(SensorLog.machine_id).subquery()
+        )
         statement = (
             select(Machine, SensorLog)
             .join(SensorLog, Machine.id == SensorLog.machine_id)
-            .join(subquery, (SensorLog.machine_id == subquery.c.machine_id) & (SensorLog.timestamp == subquery.c.max_time))
+            .join(latest, SensorLog.id == latest.c.log_id)
             .order_by(Machine.id)
         )
         results = session.exec(statement).all()